@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import re
+
+# Character classes shared by the parser and the printer.
+
+WS_CHARS = frozenset(
+    [
+        *map(chr, (0x9, 0xB, 0x20, 0xA0, 0x1680, 0x202F, 0x205F, 0x3000)),
+        *map(chr, range(0x2000, 0x200B)),
+    ],
+)
+NEWLINE_CHARS = frozenset(map(chr, (0xA, 0xD, 0x85, 0xC, 0x2028, 0x2029)))
+LINESPACE_CHARS = WS_CHARS | NEWLINE_CHARS
+
+DISALLOWED_LITERAL_CHARS = frozenset(
+    [
+        *map(chr, range(0x0, 0x9)),
+        *map(chr, range(0xE, 0x20)),
+        *map(chr, (0x7F, 0xFEFF)),
+        *map(chr, range(0xD800, 0xE000)),
+        *map(chr, range(0x200E, 0x2010)),
+        *map(chr, range(0x202A, 0x202F)),
+        *map(chr, range(0x2066, 0x206A)),
+    ],
+)
+
+# Every char that can't appear in an identifier:
+# reserved chars, whitespace, newlines, and disallowed literals.
+NON_IDENT_CHARS = frozenset(r"(){}[]/\"#;=") | LINESPACE_CHARS | DISALLOWED_LITERAL_CHARS
+
+
+def negatedCharClass(chars: frozenset[str]) -> str:
+    # Regex char class matching anything *not* in chars,
+    # with consecutive codepoints collapsed into ranges.
+    codepoints = sorted(map(ord, chars))
+    parts = []
+    i = 0
+    while i < len(codepoints):
+        j = i
+        while j + 1 < len(codepoints) and codepoints[j + 1] == codepoints[j] + 1:
+            j += 1
+        if i == j:
+            parts.append(re.escape(chr(codepoints[i])))
+        else:
+            parts.append(f"{re.escape(chr(codepoints[i]))}-{re.escape(chr(codepoints[j]))}")
+        i = j + 1
+    return f"[^{''.join(parts)}]"
+
+
+# Matches a run of chars that all pass isIdentChar().
+IDENT_CHARS_RE = re.compile(negatedCharClass(NON_IDENT_CHARS) + "+")
+
+KEYWORDS = frozenset(["true", "false", "null", "inf", "-inf", "nan"])
+
+
+def isIdentChar(ch: str) -> bool:
+    return ch != "" and ch not in NON_IDENT_CHARS
+
+
+def isKeyword(ident: str) -> bool:
+    # Whether the ident is a keyword name, in any casing.
+    # They're all short, so longer idents skip the .lower() copy.
+    return len(ident) <= 5 and ident.lower() in KEYWORDS
+
+
+def isDisallowedLiteralChar(ch: str) -> bool:
+    return ch in DISALLOWED_LITERAL_CHARS
+
+
+def isWSChar(ch: str) -> bool:
+    return ch in WS_CHARS
+
+
+def isNewlineChar(ch: str) -> bool:
+    return ch in NEWLINE_CHARS
+
+
+def isLinespaceChar(ch: str) -> bool:
+    return ch in LINESPACE_CHARS
@@ -84,7 +84,7 @@ def cli() -> None:
     with options.infile as fh:
         doc = parsefuncs.parse(fh.read(), parseConfig)
     with options.outfile as fh:
-        fh.write(doc.print(printConfig))
+        doc.write(fh, printConfig)
 
 
 def expFromString(s: str) -> str:
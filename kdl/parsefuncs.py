@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import dataclasses
+import sys
 
 from . import converters, parsing, t, types
+from .chars import IDENT_CHARS_RE, isIdentChar, isKeyword, isLinespaceChar, isNewlineChar, isWSChar
 from .errors import ParseError, ParseFragment
 from .result import Result
 from .stream import Stream
@@ -49,12 +51,13 @@ def parseBaseNode(s: Stream, start: int) -> Result[types.Node | None]:
     val, i = parseString(s, i).vi
     if val is None:
         return Result.fail(start)
-    name = val.value
+    # Names, tags, and prop keys repeat a lot across a document,
+    # so intern them to share one string object for each.
+    name = sys.intern(val.value)
     nameEnd = i
 
-    node = types.Node(tag=tag, name=name)
-
     # props and args
+    entries: list[types.LooseEntry] = []
     entryNames: set[str] = set()
     tempI = i
     while True:
@@ -71,12 +74,12 @@ def parseBaseNode(s: Stream, start: int) -> Result[types.Node | None]:
             continue
         if entry[0] is not None and entry[0] in entryNames:
             # repeated property name, replace the existing value
-            for n, existingEntry in enumerate(node.entries):
+            for n, existingEntry in enumerate(entries):
                 if existingEntry[0] == entry[0]:
-                    node.entries[n] = entry
+                    entries[n] = entry
                     break
         else:
-            node.entries.append(entry)
+            entries.append(entry)
             if entry[0] is not None:
                 entryNames.add(entry[0])
 
@@ -95,6 +98,7 @@ def parseBaseNode(s: Stream, start: int) -> Result[types.Node | None]:
         i = tempI
 
     # real children
+    nodes: list[types.Node] = []
     tempI = i
     while True:
         space, tempI = parseNodespace(s, tempI).vi
@@ -103,7 +107,7 @@ def parseBaseNode(s: Stream, start: int) -> Result[types.Node | None]:
         children, tempI = parseNodeChildren(s, tempI).vi
         if children is None:
             break
-        node.nodes = children
+        nodes = children
         i = tempI
         break
 
@@ -123,6 +127,10 @@ def parseBaseNode(s: Stream, start: int) -> Result[types.Node | None]:
 
     i = parseNodespace(s, i).i
 
+    # Built once with its final lists,
+    # rather than filling in default-allocated ones.
+    node = types.Node(name=name, tag=tag, entries=entries, nodes=nodes)
+
     for key, converter in s.config.nodeConverters.items():
         if node.matchesKey(key):
             node = converter(
@@ -171,7 +179,7 @@ def parseTag(s: Stream, start: int) -> Result[str]:
     val, i = parseString(s, i).vi
     if val is None:
         return Result.fail(start)
-    tag = val.value
+    tag = sys.intern(val.value)
     i = parseNodespace(s, i).i
     if s[i] != ")":
         raise ParseError(s, i, "Junk between tag ident and closing paren.")
@@ -179,13 +187,12 @@ def parseTag(s: Stream, start: int) -> Result[str]:
 
 
 def parseBareIdent(s: Stream, start: int) -> Result[str]:
-    res, i = parseIdentStart(s, start).vi
-    if res is None:
+    res = parseIdentStart(s, start)
+    if not res.valid:
         return Result.fail(start)
-    while isIdentChar(s[i]):
-        i += 1
-    ident = s[start:i]
-    return Result(ident, i)
+    match, i = s.matchRe(start, IDENT_CHARS_RE).vi
+    assert match is not None
+    return Result(match[0], i)
 
 
 def parseIdentStart(s: Stream, start: int) -> Result[str]:
@@ -231,7 +238,7 @@ def parseProperty(s: Stream, start: int) -> Result[tuple[str, t.Any]]:
     val, i = parseString(s, start).vi
     if val is None:
         return Result.fail(start)
-    key = val.value
+    key = sys.intern(val.value)
     i = parseNodespace(s, i).i
     if s[i] != "=":
         return Result.fail(start)
@@ -480,7 +487,7 @@ def parseKeyword(s: Stream, start: int) -> Result[types.Bool | types.Null | type
         return Result(types.Infinity(float("-inf")), i)
     elif ident == "nan":
         return Result(types.NaN(float("nan")), i)
-    elif ident.lower() in ("true", "false", "null", "inf", "-inf", "nan"):
+    elif isKeyword(ident):
         raise ParseError(s, start, f"KDL keywords must be written in lowercase, got #{ident}")
     else:
         raise ParseError(s, start, f"Unknown keyword #{ident}")
@@ -732,7 +739,7 @@ def parseIdentString(s: Stream, start: int) -> Result[types.String]:
     ident, i = parseBareIdent(s, start).vi
     if ident is None:
         return Result.fail(start)
-    if ident.lower() in ("true", "false", "null", "inf", "-inf", "nan"):
+    if isKeyword(ident):
         raise ParseError(
             s, start, "Ident strings confusable with keywords aren't allowed; use a quoted string. Got '{ident}'."
         )
@@ -824,25 +831,6 @@ def parseUnicodeSpace(s: Stream, start: int) -> Result[bool]:
     return Result(True, i)
 
 
-def isIdentChar(ch: str) -> bool:
-    if not ch:
-        return False
-    # reserved characters
-    if ch in r"(){}[]/\"#;=":
-        return False
-    if isWSChar(ch):
-        return False
-    if isNewlineChar(ch):
-        return False
-    if isDisallowedLiteralChar(ch):
-        return False
-    return True
-
-
-def isKeyword(ident: str) -> bool:
-    return ident in ("null", "true", "false")
-
-
 def isSign(ch: str) -> bool:
     return ch != "" and ch in "+-"
 
@@ -863,56 +851,6 @@ def isHexDigit(ch: str) -> bool:
     return ch != "" and ch in "0123456789abcdefABCDEF"
 
 
-def isDisallowedLiteralChar(ch: str) -> bool:
-    if not ch:
-        return False
-    cp = ord(ch)
-    if 0x0 <= cp <= 0x08:
-        return True
-    if 0xE <= cp <= 0x1F:
-        return True
-    if cp == 0x7F:
-        return True
-    if 0xD800 <= cp <= 0xDFFF:
-        return True
-    if 0x200E <= cp <= 0x200F:
-        return True
-    if 0x202A <= cp <= 0x202E:
-        return True
-    if 0x2066 <= cp <= 0x2069:
-        return True
-    if cp == 0xFEFF:
-        return True
-
-    return False
-
-
-def isWSChar(ch: str) -> bool:
-    if not ch:
-        return False
-    cp = ord(ch)
-    if cp in (0x9, 0xB, 0x20, 0xA0, 0x1680):
-        return True
-    if 0x2000 <= cp <= 0x200A:
-        return True
-    if cp in (0x202F, 0x205F, 0x3000):
-        return True
-    return False
-
-
-def isNewlineChar(ch: str) -> bool:
-    if not ch:
-        return False
-    cp = ord(ch)
-    return cp in (0x0A, 0x0D, 0x85, 0x0C, 0x2028, 0x2029)
-
-
-def isLinespaceChar(ch: str) -> bool:
-    if not ch:
-        return False
-    return isWSChar(ch) or isNewlineChar(ch)
-
-
 def parseSlashDash(s: Stream, start: int) -> Result[bool]:
     if s[start] == "/" and s[start + 1] == "-":
         i = start + 2
@@ -5,9 +5,7 @@ import bisect
 import re
 
 from . import t
-
-if t.TYPE_CHECKING:
-    from .result import Result
+from .result import Result
 
 
 @dataclass
@@ -29,18 +27,17 @@ class Stream:
                 self._lineBreaks.append(i)
 
     def __getitem__(self, key: int | slice) -> str:
+        # Single-char reads are the most common operation in the parser,
+        # so they're bounds-checked directly rather than via IndexError.
         if isinstance(key, int):
-            if key < 0:
-                return ""
-        else:
-            if key.start < 0:
-                key = slice(0, key.stop, key.step)
-            if key.stop < 0:
-                key = slice(key.start, 0, key.step)
-        try:
-            return self._chars[key]
-        except IndexError:
+            if 0 <= key < self._len:
+                return self._chars[key]
             return ""
+        if key.start < 0:
+            key = slice(0, key.stop, key.step)
+        if key.stop < 0:
+            key = slice(key.start, 0, key.step)
+        return self._chars[key]
 
     def eof(self, index: int) -> bool:
         return index >= self._len
@@ -14,6 +14,7 @@ if TYPE_CHECKING:
         Callable,
         Iterable,
         Literal,
+        TextIO,
         TypeAlias,
     )
 
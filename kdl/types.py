@@ -1,32 +1,76 @@
 from __future__ import annotations
 
 import dataclasses
+import io
+import operator
 import re
+import sys
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass
+from functools import lru_cache
 
 from . import printing, t
+from .chars import IDENT_CHARS_RE, isKeyword
 
 if t.TYPE_CHECKING:
     VT = t.TypeVar("VT")
     LooseEntry = tuple[str | None, t.Any]
 
-
-@dataclass
+# Slotted dataclasses are smaller and faster.
+# (Slotted instances reject arbitrary new attributes; see the README.)
+_slotted: dict[str, t.Any]
+if sys.version_info >= (3, 11):
+    _slotted = {"slots": True, "weakref_slot": True}
+else:
+    _slotted = {}
+
+
+def _addSlots(cls: t.Any) -> t.Any:
+    # Before 3.11, dataclass() can't give slotted classes a __weakref__ slot,
+    # so rebuild the class with its slots here instead,
+    # the same way dataclass(slots=True) does.
+    if "__slots__" in cls.__dict__:
+        return cls
+    fieldNames = tuple(field.name for field in dataclasses.fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in fieldNames:
+        # Drop the field defaults; they're baked into __init__ already,
+        # and would collide with the slots.
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = (*fieldNames, "__weakref__")
+    newCls = type(cls)(cls.__name__, cls.__bases__, namespace)
+    newCls.__qualname__ = cls.__qualname__
+    return newCls
+
+
+@_addSlots
+@dataclass(**_slotted)
 class Document:
     nodes: list[Node] = dataclasses.field(default_factory=list)
     printConfig: t.PrintConfig | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
+        buffer = io.StringIO()
+        self.write(buffer, config)
+        return buffer.getvalue()
+
+    def write(self, stream: t.TextIO, config: t.PrintConfig | None = None) -> None:
+        # Like .print(), but writes the text into stream
+        # (such as an open file) rather than returning it.
         config = config or self.printConfig or printing.defaults
-        s = ""
-        for node in self.nodes:
-            node = toKdlNode(node)
-            s += node.print(config, 0)
-        if s == "":
+        if not self.nodes:
             # always end a kdl doc with a newline
-            s = "\n"
-        return s
+            stream.write("\n")
+            return
+        for node in self.nodes:
+            if type(node) is Node:
+                node._write(stream.write, config, 0)
+            else:
+                # Node subclasses (or whatever .to_kdl() returns)
+                # might have overridden .print().
+                stream.write(toKdlNode(node).print(config, 0))
 
     @t.overload
     def get(self, key: t.NodeKey) -> Node | None:  # noqa: F811
@@ -64,7 +108,8 @@ class Document:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Node:
     name: str
     tag: str | None = None
@@ -76,44 +121,64 @@ class Node:
         config: t.PrintConfig | None = None,
         indentLevel: int = 0,
     ) -> str:
+        buffer = io.StringIO()
+        self.write(buffer, config, indentLevel)
+        return buffer.getvalue()
+
+    def write(
+        self,
+        stream: t.TextIO,
+        config: t.PrintConfig | None = None,
+        indentLevel: int = 0,
+    ) -> None:
+        # Like .print(), but writes the text into stream
+        # rather than returning it.
         if config is None:
             config = printing.defaults
+        self._write(stream.write, config, indentLevel)
 
-        s = config.indent * indentLevel
+    def _write(self, write: t.Callable[[str], t.Any], config: t.PrintConfig, indentLevel: int) -> None:
+        # Internal version of .print(), for recursion;
+        # the caller has already resolved the config.
+        indent = config.indent * indentLevel
+        write(indent)
 
         if self.tag is not None:
-            s += f"({printIdent(self.tag)})"
+            write(f"({printIdent(self.tag)})")
 
-        s += printIdent(self.name)
+        write(printIdent(self.name))
 
         entries: t.Iterable[tuple[str | None, t.Any]]
         if config.sortEntries:
-            entries = sorted(self.entries, key=lambda x: x[0] or "")
+            entries = sortedEntries(self.entries)
         else:
             entries = self.entries
         for name, value in entries:
-            value = toKdlValue(value)
+            builtin = type(value) in _kdlValueTypes
+            if not builtin:
+                value = toKdlValue(value)
             if not config.printNulls and isinstance(value, Null):
                 continue
+            # The built-in value types can skip .print()'s config check,
+            # but subclasses might have overridden .print() itself.
+            valueText = value._print(config) if builtin else value.print(config)
             if name is None:
-                s += f" {value.print(config)}"
+                write(f" {valueText}")
             else:
-                s += f" {printIdent(name)}={value.print(config)}"
+                write(f" {printIdent(name)}={valueText}")
 
         if self.nodes:
-            childrenText = ""
+            write(" {\n")
             for child in self.nodes:
-                child = toKdlNode(child)
-                childrenText += child.print(config=config, indentLevel=indentLevel + 1)
-            if childrenText:
-                s += " {\n"
-                s += childrenText
-                s += config.indent * indentLevel + "}"
+                if type(child) is Node:
+                    child._write(write, config, indentLevel + 1)
+                else:
+                    write(toKdlNode(child).print(config, indentLevel + 1))
+            write(indent + "}")
         if config.semicolons:
-            s += ";\n"
+            write(";\n")
         else:
-            s += "\n"
-        return s
+            write("\n")
 
     @t.overload
     def get(self, key: t.NodeKey) -> Node | None:  # noqa: F811
@@ -169,7 +234,19 @@ class Node:
         return self.print()
 
 
+def sortedEntries(entries: list[LooseEntry]) -> list[LooseEntry]:
+    # Args (and any ""-named props) first, in their original order,
+    # then props sorted by name.
+    # Same as sorted(entries, key=lambda x: x[0] or ""),
+    # but without calling a Python key function per entry.
+    unnamed = [entry for entry in entries if not entry[0]]
+    named = sorted([entry for entry in entries if entry[0]], key=operator.itemgetter(0))
+    return unnamed + named
+
+
 class Value(metaclass=ABCMeta):
+    __slots__ = ()
+
     value: t.Any
     tag: str | None
 
@@ -177,11 +254,17 @@ class Value(metaclass=ABCMeta):
     def print(self, config: t.PrintConfig | None = None) -> str:
         pass
 
+    def _print(self, config: t.PrintConfig) -> str:
+        # .print() with an already-resolved config.
+        # The built-in value types override this with their real printing code.
+        return self.print(config)
+
     def matchesKey(self, key: t.ValueKey) -> bool:
         return valueMatchesKey(self, key)
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class ExactValue(Value):
     # Not produced by anything in the parser,
     # but used when a native type needs a precise output
@@ -192,55 +275,59 @@ class ExactValue(Value):
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        return printTag(self.tag) + self.chars
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
+        return f"{printTag(self.tag)}{self.chars}"
 
     def __str__(self) -> str:
         return self.print()
 
 
 class Numberish(Value, metaclass=ABCMeta):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Binary(Numberish):
     value: int
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
-        s = printTag(self.tag)
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
         if config.respectRadix:
-            s += bin(self.value)
+            return f"{printTag(self.tag)}{bin(self.value)}"
         else:
-            s += str(self.value)
-        return s
+            return f"{printTag(self.tag)}{self.value}"
 
     def __str__(self) -> str:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Octal(Numberish):
     value: int
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
-        s = printTag(self.tag)
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
         if config.respectRadix:
-            s += oct(self.value)
+            return f"{printTag(self.tag)}{oct(self.value)}"
         else:
-            s += str(self.value)
-        return s
+            return f"{printTag(self.tag)}{self.value}"
 
     def __str__(self) -> str:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Decimal(Numberish):
     mantissa: int | float
     exponent: int = 0
@@ -251,86 +338,94 @@ class Decimal(Numberish):
         return self.mantissa * (10.0**self.exponent)
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
-        s = printTag(self.tag) + str(self.mantissa)
-        if self.exponent != 0:
-            s += config.exponent
-            if self.exponent > 0:
-                s += "+"
-            s += str(self.exponent)
-        return s
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
+        if self.exponent == 0:
+            return f"{printTag(self.tag)}{self.mantissa}"
+        return f"{printTag(self.tag)}{self.mantissa}{config.exponent}{self.exponent:+d}"
 
     def __str__(self) -> str:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Infinity(Numberish):
     value: float
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
-        if self.value == float("inf"):
-            return printTag(self.tag) + "#inf"
-        else:
-            return printTag(self.tag) + "#-inf"
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
+        keyword = "#inf" if self.value == float("inf") else "#-inf"
+        if self.tag is None:
+            return keyword
+        return f"{printTag(self.tag)}{keyword}"
 
     def __str__(self) -> str:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class NaN(Numberish):
     value: float = float("nan")
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        return printTag(self.tag) + "#nan"
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
+        if self.tag is None:
+            return "#nan"
+        return f"{printTag(self.tag)}#nan"
 
     def __str__(self) -> str:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Hex(Numberish):
     value: int
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
-        s = printTag(self.tag)
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
         if config.respectRadix:
-            s += hex(self.value)
+            return f"{printTag(self.tag)}{hex(self.value)}"
         else:
-            s += str(self.value)
-        return s
+            return f"{printTag(self.tag)}{self.value}"
 
     def __str__(self) -> str:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Bool(Value):
     value: bool
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
-        if self.value:
-            return printTag(self.tag) + "#true"
-        else:
-            return printTag(self.tag) + "#false"
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
+        keyword = "#true" if self.value else "#false"
+        if self.tag is None:
+            return keyword
+        return f"{printTag(self.tag)}{keyword}"
 
     def __str__(self) -> str:
         return self.print()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class Null(Value):
     tag: str | None = None
 
@@ -339,26 +434,31 @@ class Null(Value):
         return None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
-        return printTag(self.tag) + "#null"
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
+        if self.tag is None:
+            return "#null"
+        return f"{printTag(self.tag)}#null"
 
     def __str__(self) -> str:
         return self.print()
 
 
 class Stringish(Value, metaclass=ABCMeta):
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class RawString(Stringish):
     value: str
     tag: str | None = None
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
         if config.respectStringType:
             hashes = "#" * findRequiredHashCount(self.value)
             return f'{printTag(self.tag)}r{hashes}"{self.value}"{hashes}'
@@ -369,27 +469,33 @@ class RawString(Stringish):
         return self.print()
 
 
+_HASH_RUN_RE = re.compile(r'"(#*)')
+
+
 def findRequiredHashCount(chars: str) -> int:
-    for i in range(0, 100):
-        ender = '"' + ("#" * i)
-        if ender not in chars:
-            return i
-    assert False, "A raw string requires more than 100 hashes???"
+    # Needs one more hash than the longest "### sequence in the string.
+    count = 0
+    for match in _HASH_RUN_RE.finditer(chars):
+        if len(match[1]) >= count:
+            count = len(match[1]) + 1
+    return count
 
 
-@dataclass
+@_addSlots
+@dataclass(**_slotted)
 class String(Stringish):
     value: str
     tag: str | None = None
     multiline: bool = False
 
     def print(self, config: t.PrintConfig | None = None) -> str:
-        if config is None:
-            config = printing.defaults
+        return self._print(config or printing.defaults)
+
+    def _print(self, config: t.PrintConfig) -> str:
         if self.multiline:
             return ""
         elif isBareIdent(self.value):
-            return printTag(self.tag) + self.value
+            return f"{printTag(self.tag)}{self.value}"
         else:
             return f'{printTag(self.tag)}"{escapedFromRaw(self.value)}"'
 
@@ -398,6 +504,8 @@ class String(Stringish):
 
 
 def toKdlNode(val: t.Any) -> Node:
+    if type(val) is Node:
+        return val
     if isinstance(val, Node):
         return val
     if not callable(getattr(val, "to_kdl", None)):
@@ -412,6 +520,19 @@ def toKdlNode(val: t.Any) -> Node:
     return node
 
 
+# The concrete value classes, and exact-type converters for the common primitives,
+# so they skip the isinstance() chain in toKdlValue().
+# Subclasses of these still go through the full chain.
+_kdlValueTypes = frozenset([ExactValue, Binary, Octal, Decimal, Infinity, NaN, Hex, Bool, Null, RawString, String])
+_primitiveToKdl: dict[type, t.Callable[[t.Any], Value]] = {
+    type(None): lambda _: Null(),
+    bool: Bool,
+    str: String,
+    int: Decimal,
+    float: Decimal,
+}
+
+
 def toKdlValue(val: t.Any) -> t.KDLValue:
     """
     Converts any KDLish value (a KDLValue, a primitive,
@@ -419,6 +540,12 @@ def toKdlValue(val: t.Any) -> t.KDLValue:
     or an object with .to_kdl() that returns one of the above)
     into a KDLValue
     """
+    if type(val) in _kdlValueTypes:
+        return t.cast("Value", val)
+    convert = _primitiveToKdl.get(type(val))
+    if convert is not None:
+        return convert(val)
+
     import base64
     import datetime
     import decimal
@@ -502,6 +629,10 @@ def isKdlishValue(val: t.Any) -> bool:
     )
 
 
+# printTag() and printIdent() are memoized,
+# since the same names/tags recur throughout a document;
+# they must stay pure functions of their argument.
+@lru_cache(maxsize=4096)
 def printTag(tag: str | None) -> str:
     if tag is not None:
         return f"({printIdent(tag)})"
@@ -575,19 +706,29 @@ def typeMatchesKey(val: Value, key: t.TypeKey) -> bool:
         raise Exception(msg) from e
 
 
-def escapedFromRaw(chars: str) -> str:
-    return (
-        chars.replace("\\", "\\\\")
-        .replace('"', '\\"')
-        # don't escape a forward slash when printing
-        .replace("\b", "\\b")
-        .replace("\f", "\\f")
-        .replace("\n", "\\n")
-        .replace("\r", "\\r")
-        .replace("\t", "\\t")
-    )
+# don't escape a forward slash when printing
+_ESCAPES = str.maketrans(
+    {"\\": "\\\\", '"': '\\"', "\b": "\\b", "\f": "\\f", "\n": "\\n", "\r": "\\r", "\t": "\\t"},
+)
 
 
+def escapedFromRaw(chars: str) -> str:
+    # Most strings have nothing to escape;
+    # a few substring checks are much faster than .translate() for those.
+    if (
+        '"' in chars
+        or "\\" in chars
+        or "\n" in chars
+        or "\t" in chars
+        or "\r" in chars
+        or "\b" in chars
+        or "\f" in chars
+    ):
+        return chars.translate(_ESCAPES)
+    return chars
+
+
+@lru_cache(maxsize=4096)
 def printIdent(chars: str) -> str:
     if isBareIdent(chars):
         return chars
@@ -597,73 +738,12 @@ def printIdent(chars: str) -> str:
 def isBareIdent(chars: str) -> bool:
     if not chars:
         return False
-    if any(not isIdentChar(x) for x in chars):
+    if IDENT_CHARS_RE.fullmatch(chars) is None:
         return False
     if chars[0] in "0123456789":
         return False
     if len(chars) > 1 and chars[0] in "+-" and chars[1] in "0123456789":
         return False
-    if chars.lower() in ("true", "false", "null", "inf", "-inf", "nan"):
+    if isKeyword(chars):
         return False
     return True
-
-
-def isIdentChar(ch: str) -> bool:
-    if not ch:
-        return False
-    # reserved characters
-    if ch in r"(){}[]/\"#;=":
-        return False
-    if isWSChar(ch):
-        return False
-    if isNewline(ch):
-        return False
-    if isDisallowedLiteral(ch):
-        return False
-    return True
-
-
-def isDisallowedLiteral(ch: str) -> bool:
-    if not ch:
-        return False
-    cp = ord(ch)
-    if 0x0 <= cp <= 0x08:
-        return True
-    if 0xE <= cp <= 0x1F:
-        return True
-    if cp == 0x7F:
-        return True
-    if 0xD800 <= cp <= 0xDFFF:
-        return True
-    if 0x200E <= cp <= 0x200F:
-        return True
-    if 0x202A <= cp <= 0x202E:
-        return True
-    if 0x2066 <= cp <= 0x2069:
-        return True
-    if cp == 0xFEFF:
-        return True
-
-    return False
-
-
-def isWSChar(ch: str) -> bool:
-    if not ch:
-        return False
-    cp = ord(ch)
-    if cp in (0x9, 0xB, 0x20, 0xA0, 0x1680):
-        return True
-    if 0x2000 <= cp <= 0x200A:
-        return True
-    if cp in (0x202F, 0x205F, 0x3000):
-        return True
-    return False
-
-
-def isNewline(ch: str) -> bool:
-    if not ch:
-        return False
-    cp = ord(ch)
-    if cp in (0xA, 0xD, 0x85, 0xC, 0x2028, 0x2029):
-        return True
-    return False
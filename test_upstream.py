@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 
 import argparse
+import hashlib
+import io
 import os
+import pickle
 import pprint
 import sys
-from typing import Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, cast
 
 # Force the local kdl module into the environment
 sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
@@ -13,11 +18,25 @@ import kdl
 THIS_DIR = os.path.dirname(os.path.realpath(__file__))
 TEST_DIR = os.path.join(THIS_DIR, "upstream_tests", "test_cases", "input")
 GOLDEN_DIR = os.path.join(THIS_DIR, "upstream_tests", "test_cases", "expected_kdl")
+KDL_DIR = os.path.join(THIS_DIR, "kdl")
+CACHE_PATH = os.path.join(THIS_DIR, ".kdl_parse_cache.pkl")
 
 
 def main() -> None:
     cli = argparse.ArgumentParser()
     cli.add_argument("-v", dest="verbose", action="count", default=0)
+    cli.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes to parse with.",
+    )
+    cli.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse parse results from earlier --cache runs for unchanged inputs.",
+    )
     cli.add_argument("test", nargs="?", default=None, help="Run a single test, and get a diff.")
     options = cli.parse_args()
 
@@ -31,41 +50,48 @@ def main() -> None:
     parseConfig = kdl.ParseConfig(
         nativeUntaggedValues=False,
     )
-    parser = kdl.Parser(parseConfig, printConfig)
 
     if options.test:
         if options.test.endswith(".kdl"):
             singleTestName = options.test
         else:
             singleTestName = options.test + ".kdl"
-        inputs = set([singleTestName])
+        filenames = [singleTestName]
         if options.test.endswith("_fail"):
             goldens = set()
         else:
             goldens = set([singleTestName])
     else:
-        inputs, goldens = findTestFiles()
+        filenames, goldens = findTestFiles()
+
+    # Goldens are read up front, so the loop below is just comparing.
+    # Inputs are read by whichever process parses them.
+    goldenTexts = readTexts(GOLDEN_DIR, goldens)
+
+    wantDoc = options.verbose == 2
+    results: List[ParseOutcome]
+    if options.cache:
+        # Only parse the inputs that the cache hasn't seen yet.
+        # The cache is thrown out whenever kdl's source or the configs change.
+        salt = cacheSalt(parseConfig, printConfig, wantDoc)
+        cache = loadCache(salt)
+        inputTexts = readTexts(TEST_DIR, filenames)
+        keys = [hashText(inputTexts[filename]) for filename in filenames]
+        todo = {key: filename for key, filename in zip(keys, filenames) if key not in cache}
+        cache.update(zip(todo, parseTests(list(todo.values()), parseConfig, printConfig, wantDoc, options.jobs)))
+        saveCache(salt, cache)
+        results = [cache[key] for key in keys]
+    else:
+        results = parseTests(filenames, parseConfig, printConfig, wantDoc, options.jobs)
 
+    # Diagnostics are collected and written out in one go after the loop.
+    report = io.StringIO()
     good = []
     bad = []
-    for filename in sorted(inputs):
-        inputPath = os.path.join(TEST_DIR, filename)
-        inputText: str
-        with open(inputPath, "r", encoding="utf-8") as fh:
-            inputText = fh.read()
-
-        goldenText: str | None
-        if filename in goldens:
-            goldenPath = os.path.join(GOLDEN_DIR, filename)
-            with open(goldenPath, "r", encoding="utf-8") as fh:
-                goldenText = fh.read()
-        else:
-            goldenText = None
+    for filename, (outputText, outputDoc, error) in zip(filenames, results):
+        goldenText = goldenTexts.get(filename)
 
-        try:
-            outputDoc = parser.parse(inputText)
-            outputText = outputDoc.print()
-        except kdl.ParseError as e:
+        if error is not None:
             if goldenText is None:
                 # SUCCESS: expected parse failure
                 good.append(filename)
@@ -73,38 +99,27 @@ def main() -> None:
                 # FAILURE: unexpected parse failure
                 bad.append(filename)
                 if options.verbose == 2:
-                    print(f"Unexpected parse failure in {filename}")
-                    print(e)
-                    print("Input:")
-                    print(inputText)
-                    print("Expected:")
-                    print(goldenText)
-                    print("================")
-            continue
-        except Exception as e:
-            raise
-            # FAILURE: unexpected runtime error
-            bad.append(filename)
-            if options.verbose == 2:
-                print(f"BIG BAD: Internal error in {filename}")
-                print(e)
-                print("Input:")
-                print(inputText)
-                print("================")
+                    print(f"Unexpected parse failure in {filename}", file=report)
+                    print(error, file=report)
+                    print("Input:", file=report)
+                    print(readInput(filename), file=report)
+                    print("Expected:", file=report)
+                    print(goldenText, file=report)
+                    print("================", file=report)
             continue
         # Successful parse!
         if goldenText is None:
             # FAILURE: successful parse, but should be a parse failure
             bad.append(filename)
             if options.verbose == 2:
-                print(f"Unexpected successful parse in {filename}.")
-                print("Input:")
-                print(inputText)
-                print("Unexpected output (should be a parse failure)")
-                print(outputText)
-                print("Doc:")
-                print(pprint.pformat(outputDoc))
-                print("================")
+                print(f"Unexpected successful parse in {filename}.", file=report)
+                print("Input:", file=report)
+                print(readInput(filename), file=report)
+                print("Unexpected output (should be a parse failure)", file=report)
+                print(outputText, file=report)
+                print("Doc:", file=report)
+                print(outputDoc, file=report)
+                print("================", file=report)
             continue
         if outputText == goldenText:
             # SUCCESS: successful parse, matched golden
@@ -113,41 +128,176 @@ def main() -> None:
         bad.append(filename)
         if options.verbose == 2:
             # FAILURE: successful parse, but didn't match golden
-            print(f"Output didn't match golden in {filename}.")
-            print("Input:")
-            print(inputText)
-            print("Expected:")
-            print(goldenText)
-            print("Got:")
-            print(outputText)
-            print("Doc:")
-            print(pprint.pformat(outputDoc))
-            print("================")
+            print(f"Output didn't match golden in {filename}.", file=report)
+            print("Input:", file=report)
+            print(readInput(filename), file=report)
+            print("Expected:", file=report)
+            print(goldenText, file=report)
+            print("Got:", file=report)
+            print(outputText, file=report)
+            print("Doc:", file=report)
+            print(outputDoc, file=report)
+            print("================", file=report)
+    sys.stdout.write(report.getvalue())
 
     if not bad:
-        print(f"Success, {len(good)}/{len(inputs)} tests passed.")
+        print(f"Success, {len(good)}/{len(filenames)} tests passed.")
         return True
     else:
-        print(f"Failure, {len(good)}/{len(inputs)} tests passed.")
+        print(f"Failure, {len(good)}/{len(filenames)} tests passed.")
         if options.verbose == 1:
             for badfilename in bad:
                 print("* " + badfilename)
         return False
 
 
-def findTestFiles() -> Tuple[Set[str], Set[str]]:
-    inputs = set()
-    goldens = set()
-    for root, _, filenames in os.walk(TEST_DIR):
-        for filename in filenames:
-            if os.path.splitext(filename)[1] == ".kdl":
-                inputs.add(filename)
-    for root, _, filenames in os.walk(GOLDEN_DIR):
-        for filename in filenames:
-            if os.path.splitext(filename)[1] == ".kdl":
-                goldens.add(filename)
+# (printed output, pformatted doc, parse error)
+ParseOutcome = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def parseTests(
+    filenames: List[str],
+    parseConfig: kdl.ParseConfig,
+    printConfig: kdl.PrintConfig,
+    wantDoc: bool,
+    jobs: int,
+) -> List[ParseOutcome]:
+    # Each test parses independently, so spread them over processes.
+    # (Unexpected exceptions propagate out of the map, same as in-process.)
+    if jobs > 1 and len(filenames) > 1:
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=initWorker,
+            initargs=(parseConfig, printConfig),
+        ) as executor:
+            return list(executor.map(parseTest, filenames, repeat(wantDoc), chunksize=16))
+    initWorker(parseConfig, printConfig)
+    try:
+        return list(map(parseTest, filenames, repeat(wantDoc)))
+    finally:
+        # Pool workers hold their directory fd until they exit,
+        # but this process keeps running, so close it here.
+        closeWorker()
+
+
+# Set up once per worker process by initWorker(),
+# so the configs are only sent over once rather than with every test.
+workerParser: Optional[kdl.Parser] = None
+workerInputDirFd: Optional[int] = None
+
+
+def initWorker(parseConfig: kdl.ParseConfig, printConfig: kdl.PrintConfig) -> None:
+    global workerParser, workerInputDirFd
+    workerParser = kdl.Parser(parseConfig, printConfig)
+    if workerInputDirFd is None and os.open in os.supports_dir_fd:
+        workerInputDirFd = os.open(TEST_DIR, os.O_RDONLY)
+
+
+def closeWorker() -> None:
+    global workerInputDirFd
+    if workerInputDirFd is not None:
+        os.close(workerInputDirFd)
+        workerInputDirFd = None
+
+
+def readInput(filename: str) -> str:
+    if workerInputDirFd is None:
+        return readText(os.path.join(TEST_DIR, filename))
+    return readText(filename, workerInputDirFd)
+
+
+def parseTest(filename: str, wantDoc: bool) -> ParseOutcome:
+    # Runs in the worker processes, and is only sent the filename;
+    # the input is read here and dropped once it's parsed.
+    # Only returns plain strings.
+    assert workerParser is not None
+    try:
+        outputDoc = workerParser.parse(readInput(filename))
+    except kdl.ParseError as e:
+        return None, None, str(e)
+    return outputDoc.print(), pprint.pformat(outputDoc) if wantDoc else None, None
+
+
+def hashText(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def cacheSalt(parseConfig: kdl.ParseConfig, printConfig: kdl.PrintConfig, wantDoc: bool) -> bytes:
+    # Identifies everything besides the input that affects a ParseOutcome.
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((parseConfig, printConfig, wantDoc)).encode("utf-8"))
+    # This file is included too, since it defines the cached ParseOutcome shape.
+    sourcePaths = [os.path.realpath(__file__)]
+    sourcePaths += [
+        os.path.join(KDL_DIR, filename) for filename in sorted(os.listdir(KDL_DIR)) if filename.endswith(".py")
+    ]
+    for path in sourcePaths:
+        hasher.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as fh:
+            hasher.update(fh.read())
+    return hasher.digest()
+
+
+def loadCache(salt: bytes) -> Dict[bytes, ParseOutcome]:
+    # Any problem with the cache file (missing, corrupt, stale classes,
+    # wrong shape) just means starting from an empty cache.
+    try:
+        with open(CACHE_PATH, "rb") as fh:
+            cacheSaltOnDisk, cache = pickle.load(fh)
+    except Exception:
+        return {}
+    if cacheSaltOnDisk != salt or not isinstance(cache, dict):
+        return {}
+    return cast(Dict[bytes, ParseOutcome], cache)
+
+
+def saveCache(salt: bytes, cache: Dict[bytes, ParseOutcome]) -> None:
+    with open(CACHE_PATH, "wb") as fh:
+        pickle.dump((salt, cache), fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def findTestFiles() -> Tuple[List[str], Set[str]]:
+    # Inputs are only iterated, in order, so they're a sorted list;
+    # goldens are only used for membership.
+    inputs = list(walkKdlFiles(TEST_DIR))
+    inputs.sort()
+    goldens = set(walkKdlFiles(GOLDEN_DIR))
     return inputs, goldens
 
 
+def readTexts(dirPath: str, filenames: Iterable[str]) -> Dict[str, str]:
+    if os.open not in os.supports_dir_fd:
+        return {filename: readText(os.path.join(dirPath, filename)) for filename in filenames}
+    # Open each file relative to the already-open directory,
+    # so the kernel doesn't re-resolve the full path every time.
+    dirFd = os.open(dirPath, os.O_RDONLY)
+    try:
+        return {filename: readText(filename, dirFd) for filename in filenames}
+    finally:
+        os.close(dirFd)
+
+
+def readText(path: str, dirFd: Optional[int] = None) -> str:
+    # One raw read sized from fstat, skipping the TextIOWrapper layer,
+    # then the same newline normalization that text-mode open() does.
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0), dir_fd=dirFd)
+    try:
+        data = os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def walkKdlFiles(dirPath: str) -> Iterator[str]:
+    # scandir gets the file type from the directory listing itself,
+    # so unlike os.walk this doesn't stat every entry.
+    with os.scandir(dirPath) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walkKdlFiles(entry.path)
+            elif entry.name.endswith(".kdl"):
+                yield entry.name
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()